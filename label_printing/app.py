@@ -4,17 +4,28 @@
 
 import io
 import os
+import queue
 import sqlite3
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, Any
+from functools import lru_cache
+from typing import Dict, Any, List, Union
 
 from flask import Flask, jsonify, request, send_file, render_template
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont, ImageOps
 from barcode import Code128
+from barcode.charsets import code128 as code128_charset
 from barcode.writer import ImageWriter
 
 import math
 
+# products_fts.py at the repo root is shared with product_adding
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from products_fts import init_fts, fts_prefix_query
+
 # try to import win32 printing helpers when on Windows
 try:
     import win32print
@@ -47,6 +58,16 @@ PX_PER_MM = DPI / 25.4   # pixels per mm at given DPI
 LABEL_W = int(round(LABEL_W_MM * PX_PER_MM))
 LABEL_H = int(round(LABEL_H_MM * PX_PER_MM))
 
+# sheet geometry in pixels (constant per process; /calibrate overrides spacing/offset per request)
+SHEET_MARGIN = int(round(PAGE_MARGIN_MM * PX_PER_MM))
+LABEL_SPACING = int(round(LABEL_SPACING_MM * PX_PER_MM))
+GLOBAL_X_OFFSET = int(round(GLOBAL_X_OFFSET_MM * PX_PER_MM))
+GLOBAL_Y_OFFSET = int(round(GLOBAL_Y_OFFSET_MM * PX_PER_MM))
+SHEET_W = SHEET_MARGIN * 2 + LABEL_W * LABELS_PER_ROW + LABEL_SPACING * (LABELS_PER_ROW - 1)
+
+# columns a label needs; also the key order of the covering index used for barcode lookups
+LABEL_COLUMNS = "barcode, name, measure, quantity, mrp, retail_price"
+
 STORE_NAME_DEFAULT = "SRI VELAVAN SUPERMARKET"
 PRINTER_NAME = "Bar Code Printer R220"
 
@@ -61,18 +82,124 @@ except Exception:
     FONTS["regular"] = ImageFont.load_default()
     FONTS["tiny"] = ImageFont.load_default()
 
+# ---------- Label layout (pixels, resolved once from DPI) ----------
+PAD = max(2, int(round(PX_PER_MM * 0.6)))               # inset of the rounded panel
+CORNER_R = max(3, int(round(PX_PER_MM * 0.8)))
+CONTENT_INSET = int(round(PX_PER_MM * 0.4))
+CONTENT_X0 = PAD + CONTENT_INSET
+CONTENT_X1 = LABEL_W - PAD - CONTENT_INSET
+CONTENT_W = CONTENT_X1 - CONTENT_X0
+CONTENT_Y0 = PAD + CONTENT_INSET
+ROW_X0 = CONTENT_X0 + int(round(PX_PER_MM * 0.3))     # left edge of QTY / MRP rows
+ROW_X1 = CONTENT_X1 - int(round(PX_PER_MM * 0.3))     # right edge of measure / RP rows
+ROW_MIN_GAP = int(round(PX_PER_MM * 1.6))             # min gap between left and right text
+MAX_BC_W = int(round(CONTENT_W * 0.95))
+MAX_BC_H = int(round(LABEL_H * 0.46))                 # give more height room for taller module_height
+# Barcode drawn in whole printer dots: a 14-digit Code128 is 112 modules, so at
+# 2 dots/module it fits MAX_BC_W as generated and skips the resample in _render_label.
+# Set in dots (what _code128c_image draws); the python-barcode writer gets mm derived
+# from them, so both paths come out the same size.
+BC_MODULE_PX = 2
+BC_QUIET_PX = BC_MODULE_PX                            # the label margin around it is white anyway
+BC_BAR_PX = 54                                        # as tall as the old scaled-down bars
+BC_VPAD = 3                                           # white rows kept above/below the bars
+BC_MODULE_MM = BC_MODULE_PX / PX_PER_MM
+BC_QUIET_MM = BC_QUIET_PX / PX_PER_MM
+BC_BAR_MM = (BC_BAR_PX - 1) / PX_PER_MM               # the writer's bars include their end row: one extra dot
+
+# vertical steps
+STORE_DY = int(round(PX_PER_MM * 2.4))
+BC_GAP_DY = int(round(PX_PER_MM * 0.16))
+NAME_DY = int(round(PX_PER_MM * 1.8))                 # single-line name
+NAME_LINE_DY = int(round(PX_PER_MM * 1.1))            # wrapped name line pitch
+NAME_L2_DY = int(round(PX_PER_MM * 1.6))
+NAME_END_DY = int(round(PX_PER_MM * 0.6))
+INFO_DY = int(round(PX_PER_MM * 1.4))
+PRICE_DY = int(round(PX_PER_MM * 0.8))
+
+# multiline_text advances by font.getbbox("A")[3] + spacing; keep the NAME_LINE_DY pitch
+NAME_LINE_SPACING = NAME_LINE_DY - FONTS["regular"].getbbox("A")[3]
+
 # ---------- App ----------
 app = Flask(__name__)
 
 
-def get_db():
-    conn = sqlite3.connect(DB_PATH)
+# idle connections, reused across requests (the dev server runs each request on a new thread)
+_idle_conns: "queue.SimpleQueue[sqlite3.Connection]" = queue.SimpleQueue()
+
+
+def _connect() -> sqlite3.Connection:
+    # timeout: busy_timeout 30s; cached_statements: prepared SQL reused across requests
+    conn = sqlite3.connect(DB_PATH, timeout=30, check_same_thread=False, cached_statements=256)
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")     # readers don't block the product_adding writer
+    conn.execute("PRAGMA synchronous=NORMAL")
     return conn
 
 
+@contextmanager
+def get_db():
+    """Borrow a pooled connection; commits on success, rolls back on error, then returns it."""
+    try:
+        conn = _idle_conns.get_nowait()
+    except queue.Empty:
+        conn = _connect()
+    try:
+        with conn:
+            yield conn
+    finally:
+        _idle_conns.put(conn)
+
+
+def init_db():
+    """
+    Create the covering index used by barcode lookups (/preview, /api/print).
+    barcode is already the PRIMARY KEY, but that index still needs a table row
+    lookup; the covering index answers the label query on its own.
+    """
+    with get_db() as conn:
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_products_barcode_cov'"
+        ).fetchone()
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_products_barcode_cov ON products({LABEL_COLUMNS})")
+        if not exists:
+            conn.execute("ANALYZE")
+        init_fts(conn)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS print_log (
+                barcode TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                timestamp TEXT NOT NULL
+            )
+        """)
+
+
+def log_print_job(barcode: str, count: int, ts: str | None = None):
+    """Record one row per print job (not per label) in a single transaction."""
+    ts = ts or datetime.now().isoformat(sep=" ", timespec="seconds")
+    with get_db() as conn:
+        conn.execute(
+            "INSERT INTO print_log (barcode, count, timestamp) VALUES (?, ?, ?)",
+            (barcode, count, ts),
+        )
+
+
 def query_products_by_name(q: str, limit: int = 20):
     with get_db() as conn:
+        # queries with nothing to tokenize ("-", "&") keep the LIKE scan, as in product_adding
+        if any(ch.isalnum() for ch in q):
+            try:
+                # index probe instead of a full scan per keystroke; prefix match suits autocomplete
+                cur = conn.execute(
+                    """
+                    SELECT p.* FROM products_fts f JOIN products p ON p.rowid = f.rowid
+                    WHERE products_fts MATCH ? ORDER BY rank LIMIT ?
+                    """,
+                    (fts_prefix_query(q), limit),
+                )
+                return [dict(row) for row in cur.fetchall()]
+            except sqlite3.OperationalError:
+                pass  # FTS table not created yet (init_db not run)
         cur = conn.execute(
             "SELECT * FROM products WHERE name LIKE ? ORDER BY name LIMIT ?",
             (f"%{q}%", limit),
@@ -82,54 +209,96 @@ def query_products_by_name(q: str, limit: int = 20):
 
 def get_product_by_barcode(barcode: str) -> Dict[str, Any] | None:
     with get_db() as conn:
-        cur = conn.execute("SELECT * FROM products WHERE barcode = ?", (barcode,))
+        try:
+            # the planner prefers the unique PRIMARY KEY index, so name the covering one
+            cur = conn.execute(
+                f"SELECT {LABEL_COLUMNS} FROM products INDEXED BY idx_products_barcode_cov WHERE barcode = ?",
+                (barcode,),
+            )
+        except sqlite3.OperationalError:
+            # index not created yet (init_db not run)
+            cur = conn.execute(f"SELECT {LABEL_COLUMNS} FROM products WHERE barcode = ?", (barcode,))
         row = cur.fetchone()
         return dict(row) if row else None
 
 
+# (id(font), text) -> width; FONTS entries live for the whole process so their ids are stable
+_textlen_cache: Dict[tuple, float] = {}
+
+
+def _text_length(text: str, font) -> float:
+    """font.getlength with a process-wide memo (store name, price rows repeat on every label)."""
+    key = (id(font), text)
+    width = _textlen_cache.get(key)
+    if width is None:
+        if len(_textlen_cache) >= 10000:
+            _textlen_cache.clear()
+        width = _textlen_cache[key] = font.getlength(text)
+    return width
+
+
 def _generate_barcode_pil(code_text: str) -> Image.Image:
     """
     Generate barcode optimized for thermal printing (203 DPI).
     Increased module_width for thicker bars to improve scanner reliability.
     """
-    code_text = str(code_text or "").strip()
-    if not code_text.isdigit():
-        code_text = code_text.zfill(14)[:14]
-    else:
-        code_text = code_text.zfill(14)[:14]
+    # normalize before the cache so "123" and "00000000000123" share one entry
+    code_text = str(code_text or "").strip().zfill(14)[:14]
+    return _barcode_image(code_text).copy()
 
-    barcode_obj = Code128(code_text, writer=ImageWriter())
-    buf = io.BytesIO()
 
-    # Wider module_width (0.40) for thicker bars on thermal head,
-    # module_height increased slightly to give barcode ample vertical stroke for scanning.
-    barcode_obj.write(buf, options={
-        "module_width": 0.60,    # increased from 0.33 to 0.40 for sturdier bars
-        "module_height": 18.0,   # a bit taller to help cheap scanners
-        "quiet_zone": 4.0,       # quiet zone (tunable)
+# Code128 symbol table as module bit arrays (True = bar), indexed by symbol value
+_CODE128_BITS = [np.frombuffer(p.encode(), dtype=np.uint8) == ord("1") for p in code128_charset.CODES]
+_CODE128_STOP_BITS = np.frombuffer((code128_charset.STOP + "11").encode(), dtype=np.uint8) == ord("1")
+
+
+def _code128c_image(digits: str) -> Image.Image:
+    """
+    Rasterize an even-length digit string as Code128 set C straight from the
+    symbol table: one symbol per digit pair, then the mod-103 check and stop.
+    Every module is exactly BC_MODULE_PX dots wide; the writer lays bars out
+    in float mm and drifts by a dot here and there past ~100 modules.
+    """
+    values = [code128_charset.START_CODES["C"]] + [int(digits[i:i + 2]) for i in range(0, len(digits), 2)]
+    check = (values[0] + sum(i * v for i, v in enumerate(values[1:], 1))) % 103
+    modules = np.concatenate([_CODE128_BITS[v] for v in values] + [_CODE128_BITS[check], _CODE128_STOP_BITS])
+
+    row = np.pad(np.repeat(modules, BC_MODULE_PX), BC_QUIET_PX)
+    bars = np.pad(np.broadcast_to(row, (BC_BAR_PX, row.size)), ((BC_VPAD, BC_VPAD), (0, 0)))
+    return Image.fromarray(np.where(bars, 0, 255).astype(np.uint8), "L")
+
+
+@lru_cache(maxsize=1024)
+def _barcode_image(code_text: str) -> Image.Image:
+    """Rasterize a normalized 14-char code. Cached; do not mutate the result."""
+    # numeric codes (every barcode this app assigns) skip python-barcode entirely
+    if code_text.isascii() and code_text.isdigit():
+        return _code128c_image(code_text)
+
+    # mode "L": the writer draws straight into a grayscale image, no RGB pass
+    barcode_obj = Code128(code_text, writer=ImageWriter(mode="L"))
+
+    # Module width is a whole number of printer dots so every bar prints at the same width;
+    # module_height keeps the bars as tall as they were when this was drawn large and scaled down.
+    # render() hands back the PIL image the writer drew, skipping a PNG encode/decode.
+    img = barcode_obj.render(writer_options={
+        "module_width": BC_MODULE_MM,
+        "module_height": BC_BAR_MM,
+        "quiet_zone": BC_QUIET_MM,
         "write_text": False,
         "background": "white",
         "foreground": "black",
         "dpi": DPI
     })
-    buf.seek(0)
-
-    # Open as grayscale; threshold at 128 produces crisp black/white bars.
-    img = Image.open(buf).convert("L")
-    img = img.point(lambda p: 0 if p < 128 else 255, mode="1").convert("RGB")
-
-    # Trim whitespace while keeping small quiet-zone padding
-    bbox = img.convert("L").point(lambda p: 0 if p < 250 else 255).getbbox()
-    if bbox:
-        left, upper, right, lower = bbox
-        pad = max(1, int(round(PX_PER_MM * 0.6)))  # ~0.6 mm
-        left = max(0, left - pad)
-        upper = max(0, upper - pad)
-        right = min(img.width, right + pad)
-        lower = min(img.height, lower + pad)
-        img = img.crop((left, upper, right, lower))
 
-    return img
+    # Threshold at 128 produces crisp black/white bars.
+    # Trim the writer's fixed 1mm top/bottom margin down to BC_VPAD rows.
+    bars = np.asarray(img) < 128
+    rows = np.flatnonzero(bars.any(axis=1))
+    if rows.size:
+        bars = bars[max(0, rows[0] - BC_VPAD):rows[-1] + 1 + BC_VPAD]
+    binarized = np.where(bars, 0, 255).astype(np.uint8)
+    return Image.fromarray(binarized, "L")
 
 
 def compose_label(product: Dict[str, Any],
@@ -137,39 +306,67 @@ def compose_label(product: Dict[str, Any],
                   exp: str = "") -> Image.Image:
     """
     Compose one label sized LABEL_W x LABEL_H pixels.
+    Rendered labels are cached per printed field values, so reprints skip
+    barcode generation and text layout; the caller gets its own copy.
     """
-    label = Image.new("RGB", (LABEL_W, LABEL_H), "white")
+    return _render_label(
+        str(product.get("barcode", "")).strip(),
+        str(product.get("name", "")).strip(),
+        product.get("measure", ""),
+        product.get("quantity", ""),
+        product.get("mrp", 0),
+        product.get("retail_price", 0),
+        store_name,
+    ).copy()
+
+
+@lru_cache(maxsize=8)
+def _chrome_template(store_name: str) -> Image.Image:
+    """
+    The parts of a label that don't depend on the product: the rounded panel
+    and the store name. One per store name; do not mutate the result.
+    """
+    # grayscale: the printer is black/white, so RGB only tripled every copy/paste
+    label = Image.new("L", (LABEL_W, LABEL_H), 255)
     draw = ImageDraw.Draw(label)
-    cx = LABEL_W // 2
 
     # inner rounded panel
-    pad = max(2, int(round(PX_PER_MM * 0.6)))
-    panel = (pad, pad, LABEL_W - pad, LABEL_H - pad)
-    corner_radius = max(3, int(round(PX_PER_MM * 0.8)))
-    draw.rounded_rectangle(panel, radius=corner_radius, fill="white", outline="black", width=1)
-
-    content_x0 = pad + int(round(PX_PER_MM * 0.4))
-    content_x1 = LABEL_W - pad - int(round(PX_PER_MM * 0.4))
-    content_width = content_x1 - content_x0
-    y = pad + int(round(PX_PER_MM * 0.4))
+    panel = (PAD, PAD, LABEL_W - PAD, LABEL_H - PAD)
+    draw.rounded_rectangle(panel, radius=CORNER_R, fill="white", outline="black", width=1)
 
     # store name (centered)
+    content_width = CONTENT_W
     store_text = (store_name or STORE_NAME_DEFAULT).strip().upper()
     store_font = FONTS["bold"]
-    if draw.textlength(store_text, font=store_font) > content_width:
+    if _text_length(store_text, store_font) > content_width:
         store_font = FONTS["regular"]
-    if draw.textlength(store_text, font=store_font) > content_width:
-        while draw.textlength(store_text + "...", font=store_font) > content_width and len(store_text) > 3:
+    if _text_length(store_text, store_font) > content_width:
+        while _text_length(store_text + "...", store_font) > content_width and len(store_text) > 3:
             store_text = store_text[:-1]
         store_text += "..."
-    sw = draw.textlength(store_text, font=store_font)
-    draw.text((cx - sw / 2, y), store_text, font=store_font, fill="black")
-    y += int(round(PX_PER_MM * 2.4))
-
-    # barcode area
-    bc_img = _generate_barcode_pil(str(product.get("barcode", "")).strip() or "0000000000000")
-    max_bc_w = int(round(content_width * 0.95))
-    max_bc_h = int(round(LABEL_H * 0.46))  # give more height room for taller module_height
+    draw.text((LABEL_W // 2, CONTENT_Y0), store_text, font=store_font, fill="black", anchor="ma")
+    return label
+
+
+# typed=True: quantity 1 and 1.0 print differently ("QTY: 1" vs "QTY: 1.0")
+@lru_cache(maxsize=256, typed=True)
+def _render_label(barcode, name, measure, quantity, mrp, retail_price, store_name) -> Image.Image:
+    """
+    Render the label for the given field values. The key holds every printed
+    field, so an edited product simply misses the cache. Do not mutate the result.
+    """
+    # start from the panel + store name and draw only the product fields
+    label = _chrome_template(store_name).copy()
+    draw = ImageDraw.Draw(label)
+    cx = LABEL_W // 2
+
+    content_width = CONTENT_W
+    y = CONTENT_Y0 + STORE_DY
+
+    # barcode area (numeric codes already fit; the resize only catches longer alphanumeric ones)
+    bc_img = _generate_barcode_pil(barcode or "0000000000000")
+    max_bc_w = MAX_BC_W
+    max_bc_h = MAX_BC_H
     w_ratio = max_bc_w / bc_img.width if bc_img.width > max_bc_w else 1.0
     h_ratio = max_bc_h / bc_img.height if bc_img.height > max_bc_h else 1.0
     ratio = min(w_ratio, h_ratio, 1.0)
@@ -180,19 +377,19 @@ def compose_label(product: Dict[str, Any],
 
     bc_x = cx - bc_img.width // 2
     label.paste(bc_img, (bc_x, y))
-    y = y + bc_img.height + int(round(PX_PER_MM * 0.16))
+    y = y + bc_img.height + BC_GAP_DY
 
     # product name (wrap if needed)
-    prod_name = str(product.get("name", "")).strip()
+    prod_name = name
     name_font = FONTS["regular"]
-    if draw.textlength(prod_name, font=name_font) <= content_width:
-        draw.text((cx - draw.textlength(prod_name, font=name_font) / 2, y), prod_name, font=name_font, fill="black")
-        y += int(round(PX_PER_MM * 1.8))
+    if _text_length(prod_name, name_font) <= content_width:
+        draw.text((cx, y), prod_name, font=name_font, fill="black", anchor="ma")
+        y += NAME_DY
     else:
         words = prod_name.split()
         l1, l2 = "", ""
         for w in words:
-            if draw.textlength((l1 + " " + w).strip(), font=name_font) <= content_width:
+            if _text_length((l1 + " " + w).strip(), name_font) <= content_width:
                 l1 = (l1 + " " + w).strip()
             else:
                 l2 = (l2 + " " + w).strip()
@@ -200,53 +397,53 @@ def compose_label(product: Dict[str, Any],
             l1 = prod_name[:int(len(prod_name) / 2)]
             l2 = prod_name[int(len(prod_name) / 2):]
         def fit_line(s):
-            while draw.textlength(s + "...", font=name_font) > content_width and len(s) > 3:
+            while _text_length(s + "...", name_font) > content_width and len(s) > 3:
                 s = s[:-1]
-            return s + "..." if draw.textlength(s, font=name_font) > content_width else s
+            return s + "..." if _text_length(s, name_font) > content_width else s
         l1 = fit_line(l1)
         l2 = fit_line(l2) if l2 else ""
-        draw.text((cx - draw.textlength(l1, font=name_font) / 2, y), l1, font=name_font, fill="black")
-        y += int(round(PX_PER_MM * 1.1))
+        # one centered multiline call instead of measuring + drawing each line
+        wrapped = "\n".join([l1, l2]) if l2 else l1
+        draw.multiline_text((cx, y), wrapped, font=name_font, fill="black",
+                            anchor="ma", align="center", spacing=NAME_LINE_SPACING)
+        y += NAME_LINE_DY
         if l2:
-            draw.text((cx - draw.textlength(l2, font=name_font) / 2, y), l2, font=name_font, fill="black")
-            y += int(round(PX_PER_MM * 1.6))
+            y += NAME_L2_DY
         else:
-            y += int(round(PX_PER_MM * 0.6))
+            y += NAME_END_DY
 
     # info row (QTY and measure)
     info_font = FONTS["tiny"]
-    left_info = f"QTY: {product.get('quantity', '')}"
-    right_info = f"{product.get('measure', '')}"
-    left_x = content_x0 + int(round(PX_PER_MM * 0.3))
-    right_x = content_x1 - int(round(PX_PER_MM * 0.3)) - draw.textlength(right_info, font=info_font)
-    if right_x - (left_x + draw.textlength(left_info, font=info_font)) < int(round(PX_PER_MM * 1.6)):
+    left_info = f"QTY: {quantity}"
+    right_info = f"{measure}"
+    left_x = ROW_X0
+    right_x = ROW_X1  # right edge; anchor="ra" right-aligns
+    if right_x - _text_length(right_info, info_font) - (left_x + _text_length(left_info, info_font)) < ROW_MIN_GAP:
         if len(right_info) > 6:
             right_info = right_info[:6] + "..."
-            right_x = content_x1 - int(round(PX_PER_MM * 0.3)) - draw.textlength(right_info, font=info_font)
     draw.text((left_x, y), left_info, font=info_font, fill="black")
-    draw.text((right_x, y), right_info, font=info_font, fill="black")
-    y += int(round(PX_PER_MM * 1.4))
+    draw.text((right_x, y), right_info, font=info_font, fill="black", anchor="ra")
+    y += INFO_DY
 
     # price row
     price_font = FONTS["bold"]
     try:
-        mrp_val = float(product.get("mrp", 0))
+        mrp_val = float(mrp)
     except Exception:
         mrp_val = 0
     try:
-        rp_val = float(product.get("retail_price", 0))
+        rp_val = float(retail_price)
     except Exception:
         rp_val = 0
     mrp_text = f"MRP: ₹{mrp_val:g}"
     rp_text = f"RP: ₹{rp_val:g}"
-    left_x = content_x0 + int(round(PX_PER_MM * 0.3))
-    right_x = content_x1 - int(round(PX_PER_MM * 0.3)) - draw.textlength(rp_text, font=price_font)
-    if right_x - (left_x + draw.textlength(mrp_text, font=price_font)) < int(round(PX_PER_MM * 1.6)):
+    left_x = ROW_X0
+    right_x = ROW_X1
+    if right_x - _text_length(rp_text, price_font) - (left_x + _text_length(mrp_text, price_font)) < ROW_MIN_GAP:
         price_font = FONTS["regular"]
-        right_x = content_x1 - int(round(PX_PER_MM * 0.3)) - draw.textlength(rp_text, font=price_font)
     draw.text((left_x, y), mrp_text, font=price_font, fill="black")
-    draw.text((right_x, y), rp_text, font=price_font, fill="black")
-    y += int(round(PX_PER_MM * 0.8))
+    draw.text((right_x, y), rp_text, font=price_font, fill="black", anchor="ra")
+    y += PRICE_DY
 
     return label
 
@@ -295,7 +492,7 @@ def preview_label():
 
     img = compose_label(product, store_name=store, exp=exp)
     buf = io.BytesIO()
-    img.save(buf, format="PNG", dpi=(DPI, DPI))
+    img.save(buf, format="PNG", dpi=(DPI, DPI), compress_level=1)  # local preview: speed over size
     buf.seek(0)
     return send_file(buf, mimetype="image/png")
 
@@ -305,34 +502,71 @@ def compose_sheet(product: Dict[str, Any], count: int, store_name: str = STORE_N
     Compose sheet containing `count` labels in rows of LABELS_PER_ROW.
     Uses GLOBAL_X_OFFSET_MM for small left/right adjustments.
     """
+    sheet_h, positions = _sheet_positions(count)
+    label_img = compose_label(product, store_name=store_name, exp=exp)
+    return _tile_labels(SHEET_W, sheet_h, label_img, positions)
+
+
+def _sheet_positions(count: int):
+    """Sheet height and the (x, y) of each of `count` cells, LABELS_PER_ROW to a row."""
     rows = math.ceil(max(1, count) / LABELS_PER_ROW)
 
-    margin_x = int(round(PAGE_MARGIN_MM * PX_PER_MM))
-    margin_y = int(round(PAGE_MARGIN_MM * PX_PER_MM))
-    spacing = int(round(LABEL_SPACING_MM * PX_PER_MM))
-    
-    global_x_offset = int(round(GLOBAL_X_OFFSET_MM * PX_PER_MM))
-    global_y_offset = int(round(GLOBAL_Y_OFFSET_MM * PX_PER_MM))
+    margin_x = margin_y = SHEET_MARGIN
+    spacing = LABEL_SPACING
+    global_x_offset = GLOBAL_X_OFFSET
+    global_y_offset = GLOBAL_Y_OFFSET
 
-    sheet_w = margin_x * 2 + LABEL_W * LABELS_PER_ROW + spacing * (LABELS_PER_ROW - 1)
     sheet_h = margin_y * 2 + LABEL_H * rows + spacing * (rows - 1)
 
-    sheet = Image.new("RGB", (sheet_w, sheet_h), "white")
+    # column / row origins once; every cell is just a pairing of the two
+    x_positions = [margin_x + c * (LABEL_W + spacing) + global_x_offset for c in range(LABELS_PER_ROW)]
+    y_positions = [margin_y + r * (LABEL_H + spacing) + global_y_offset for r in range(rows)]
+    positions = [(x, y) for y in y_positions for x in x_positions][:count]
+    return sheet_h, positions
 
-    label_img = compose_label(product, store_name=store_name, exp=exp)
 
-    pasted = 0
-    for r in range(rows):
-        for c in range(LABELS_PER_ROW):
-            if pasted >= count:
-                # pasted += 1
-                continue
-            x = margin_x + c * (LABEL_W + spacing) + global_x_offset
-            y = margin_y + r * (LABEL_H + spacing) + global_y_offset
-            sheet.paste(label_img, (x, y))
-            pasted += 1
+# label renders for mixed sheets; barcode rasterizing and Pillow's C calls overlap across threads
+_render_pool = ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1))
+
+
+def compose_mixed_sheet(products: List[Dict[str, Any]], store_name: str = STORE_NAME_DEFAULT, exp: str = "") -> Image.Image:
+    """
+    Compose a sheet with one label per entry in `products`, in order.
+    Distinct labels are rendered in parallel; repeats come from the label cache.
+    """
+    sheet_h, positions = _sheet_positions(len(products))
+    labels = list(_render_pool.map(lambda p: compose_label(p, store_name=store_name, exp=exp), products))
+    return _place_labels(SHEET_W, sheet_h, zip(labels, positions))
+
+
+def _tile_labels(sheet_w: int, sheet_h: int, label_img: Image.Image, positions) -> Image.Image:
+    """Build a white sheet with `label_img` at each (x, y) in `positions`."""
+    return _place_labels(sheet_w, sheet_h, ((label_img, pos) for pos in positions), label_img.mode)
+
 
-    return sheet
+def _place_labels(sheet_w: int, sheet_h: int, placed, mode: str = "L") -> Image.Image:
+    """
+    Build a white sheet from (label_img, (x, y)) pairs; all labels share one
+    mode (`mode` is only used when there are none). The label bytes go into
+    one NumPy buffer with slice assignments instead of one Image.paste per
+    cell; offsets are clipped like paste does.
+    """
+    sheet_arr = None
+    arrays = {}
+    for label_img, (x, y) in placed:
+        label_arr = arrays.get(id(label_img))
+        if label_arr is None:
+            label_arr = arrays[id(label_img)] = np.asarray(label_img)
+        if sheet_arr is None:
+            sheet_arr = np.full((sheet_h, sheet_w) + label_arr.shape[2:], 255, dtype=np.uint8)
+        lh, lw = label_arr.shape[:2]
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + lw, sheet_w), min(y + lh, sheet_h)
+        if x0 < x1 and y0 < y1:
+            sheet_arr[y0:y1, x0:x1] = label_arr[y0 - y:y1 - y, x0 - x:x1 - x]
+    if sheet_arr is None:
+        return Image.new(mode, (sheet_w, sheet_h), "white")
+    return Image.fromarray(sheet_arr)
 
 
 # def print_image_windows(image_path: str, title: str = "Label Print", printer_name: str = None):
@@ -371,18 +605,18 @@ def compose_sheet(product: Dict[str, Any], count: int, store_name: str = STORE_N
 #     hDC.EndDoc()
 #     hDC.DeleteDC()
 
-def print_image_windows(image_path: str, title: str = "Label Print", printer_name: str = None):
-    """Print image to Windows printer (Rongta R220) with exact sizing, paginated vertically."""
+def print_image_windows(image: Union[str, Image.Image], title: str = "Label Print", printer_name: str = None):
+    """Print image (path or PIL image) to Windows printer (Rongta R220) with exact sizing, paginated vertically."""
     if not WINDOWS_PRINTING_AVAILABLE:
         raise RuntimeError("Windows printing is not available on this system.")
 
     if not printer_name:
         printer_name = win32print.GetDefaultPrinter()
 
-    img = Image.open(image_path)
+    img = Image.open(image) if isinstance(image, str) else image
     if img.mode != '1':
-        img = img.convert('L')
-        img = img.point(lambda x: 0 if x < 128 else 255, '1')  # crisp B/W
+        # crisp B/W: undithered convert thresholds at 128 in one C pass
+        img = img.convert('1', dither=Image.Dither.NONE)
 
     # Create printer DC
     hDC = win32ui.CreateDC()
@@ -413,9 +647,11 @@ def print_image_windows(image_path: str, title: str = "Label Print", printer_nam
             target_h = int(slice_img.height * dpi_y / DPI)
 
             # Resize to printer pixel equivalent to avoid distortion
+            # (skipped when the printer runs at the source DPI, e.g. the R220 at 203)
             if slice_img.mode != "RGB":
                 slice_img = slice_img.convert("RGB")
-            slice_img = slice_img.resize((target_w, target_h), Image.Resampling.NEAREST)
+            if slice_img.size != (target_w, target_h):
+                slice_img = slice_img.resize((target_w, target_h), Image.Resampling.NEAREST)
 
             hDC.StartPage()
             dib = ImageWin.Dib(slice_img)
@@ -498,13 +734,12 @@ def api_print():
         return jsonify({"ok": False, "error": "product not found"}), 404
 
     sheet = compose_sheet(product, count, store_name=store, exp=exp)
-    tmp_path = os.path.abspath("label_sheet.png")
-    sheet.save(tmp_path, format="PNG", dpi=(DPI, DPI))
 
     printed = 0
     errors = []
     try:
-        print_image_windows(tmp_path, title="Labels", printer_name=PRINTER_NAME)
+        # hand the in-memory sheet straight to the printer (no temp PNG on disk)
+        print_image_windows(sheet, title="Labels", printer_name=PRINTER_NAME)
         printed = count
     except Exception as e:
         available = []
@@ -515,10 +750,11 @@ def api_print():
         errors.append(f"{str(e)} | Available printers: {available}")
         printed = 0
 
-    try:
-        os.remove(tmp_path)
-    except Exception:
-        pass
+    if printed:
+        try:
+            log_print_job(barcode, printed)
+        except sqlite3.Error as e:
+            errors.append(f"print log failed: {e}")
 
     return jsonify({
         "ok": printed == count,
@@ -558,35 +794,37 @@ def calibrate():
         "retail_price": 38
     }
 
-    margin_x = int(round(PAGE_MARGIN_MM * PX_PER_MM))
-    margin_y = int(round(PAGE_MARGIN_MM * PX_PER_MM))
+    margin_x = margin_y = SHEET_MARGIN
     spacing = int(round(spacing_mm * PX_PER_MM))
     global_x_offset = int(round(offset_mm * PX_PER_MM))
 
     rows = math.ceil(max(1, count) / LABELS_PER_ROW)
     sheet_w = margin_x * 2 + LABEL_W * LABELS_PER_ROW + spacing * (LABELS_PER_ROW - 1)
     sheet_h = margin_y * 2 + LABEL_H * rows + spacing * (rows - 1)
-    sheet = Image.new("RGB", (sheet_w, sheet_h), "white")
+    # RGB here only so the calibration marks can be drawn in red
+    label_img = compose_label(sample).convert("RGB")
 
-    label_img = compose_label(sample)
-    draw = ImageDraw.Draw(sheet)
+    x_positions = [margin_x + c * (LABEL_W + spacing) + global_x_offset for c in range(LABELS_PER_ROW)]
+    y_positions = [margin_y + r * (LABEL_H + spacing) for r in range(rows)]
+    cells = [(x, y) for y in y_positions for x in x_positions]
 
-    pasted = 0
-    for r in range(rows):
-        for c in range(LABELS_PER_ROW):
-            x = margin_x + c * (LABEL_W + spacing) + global_x_offset
-            y = margin_y + r * (LABEL_H + spacing)
+    sheet = _tile_labels(sheet_w, sheet_h, label_img, cells[:count])
+    draw = ImageDraw.Draw(sheet)
+    for i, (x, y) in enumerate(cells):
+        if i >= count:
+            # empty slot: show the label outline (filled slots are covered by the label)
             draw.rectangle((x, y, x + LABEL_W - 1, y + LABEL_H - 1), outline="red", width=1)
-            if pasted < count:
-                sheet.paste(label_img, (x, y))
-            draw.text((x + 2, y + 2), str(pasted + 1), font=FONTS["tiny"], fill="red")
-            pasted += 1
+        draw.text((x + 2, y + 2), str(i + 1), font=FONTS["tiny"], fill="red")
 
     buf = io.BytesIO()
-    sheet.save(buf, format="PNG", dpi=(DPI, DPI))
+    sheet.save(buf, format="PNG", dpi=(DPI, DPI), compress_level=1)
     buf.seek(0)
     return send_file(buf, mimetype="image/png")
 
 
+# schema at import, not only under __main__: `flask run` and WSGI servers import this
+# module, and log_print_job needs print_log on the very first print
+init_db()
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5003, debug=True)
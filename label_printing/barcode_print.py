@@ -45,7 +45,9 @@ def print_image(image_path: str, title: str = "Label Print", printer_name: str =
     #     img = img.convert("RGB")
     # img = img.resize((target_w, target_h))
     target_w, target_h = 256, 160  # 32x20mm at 203dpi
-    img = img.resize((target_w, target_h))
+    if img.size != (target_w, target_h):
+        # B/W line art: nearest keeps bar edges hard and skips bicubic weighting
+        img = img.resize((target_w, target_h), Image.Resampling.NEAREST)
 
 
     # Start printing
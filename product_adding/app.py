@@ -1,10 +1,25 @@
 """pip install googletrans==4.0.0-rc1
 pip install legacy-cgi
 pip install flask
+pip install orjson flask-compress   # optional: faster / compressed JSON responses
 """
 
-from flask import Flask, render_template, request, redirect, session, jsonify
+from flask import Flask, Response, render_template, request, redirect, session, jsonify
 import sqlite3, uuid, datetime
+import atexit
+import itertools
+import json
+import os
+import queue
+import secrets
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from functools import lru_cache
+from flask.json.provider import DefaultJSONProvider
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SecureCookieSession, SessionInterface
 from googletrans import Translator   # pip install googletrans==4.0.0-rc1
 import uuid, base64
 # translit_phoneme_pipeline_improved.py
@@ -12,14 +27,89 @@ import re
 from g2p_en import G2p
 from indic_transliteration import sanscript
 from indic_transliteration.sanscript import transliterate
+try:
+    import orjson  # optional: pip install orjson -- faster JSON for every jsonify() response
+except ImportError:
+    orjson = None
+try:
+    from flask_compress import Compress  # optional: pip install flask-compress
+except ImportError:
+    Compress = None
 
-g2p = G2p()
+# products_fts.py at the repo root is shared with label_printing
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from products_fts import init_fts, fts_prefix_query
 
 
 app = Flask(__name__)
 app.secret_key = "super_secret_key"
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """jsonify / flask.json through orjson; anything orjson can't encode goes to Flask's default()."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        option = orjson.OPT_NON_STR_KEYS
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            option |= orjson.OPT_INDENT_2
+        # orjson already returns UTF-8 bytes; no str round-trip for the response body
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=option) + b"\n", mimetype=self.mimetype
+        )
+
+
+if orjson is not None:
+    app.json = OrjsonProvider(app)
+
+if Compress is not None:
+    # JSON only (catalog + per-keystroke search); level 1 is most of the size win for little CPU
+    app.config["COMPRESS_MIMETYPES"] = ["application/json"]
+    app.config["COMPRESS_LEVEL"] = 1            # gzip
+    app.config["COMPRESS_BR_LEVEL"] = 1
+    app.config["COMPRESS_ZSTD_LEVEL"] = 1
+    app.config["COMPRESS_DEFLATE_LEVEL"] = 1
+    app.config["COMPRESS_MIN_SIZE"] = 500
+    # /api/all_products is streamed, and the streaming default leaves gzip out
+    app.config["COMPRESS_ALGORITHM_STREAMING"] = ["zstd", "br", "gzip", "deflate"]
+    Compress(app)
+
 DB_NAME = "Data/products.db"
-translator = Translator()
+TRANSLATION_CACHE_PATH = "Data/translation_cache.json"
+
+# ---------- Lazy G2p model / translator ----------
+# Loading G2p (nltk data + model weights) took seconds at import and every route paid for it
+# at startup, even search/edit/delete which never transliterate. Built on first use instead;
+# __main__ warms the model on a background thread while the server starts.
+_g2p = None
+_translator = None
+# one lock each: the translator must not wait behind a several-second G2p() build
+_g2p_lock = threading.Lock()
+_translator_lock = threading.Lock()
+
+
+def get_g2p():
+    global _g2p
+    if _g2p is None:
+        with _g2p_lock:
+            if _g2p is None:
+                _g2p = G2p()
+    return _g2p
+
+
+def get_translator():
+    global _translator
+    if _translator is None:
+        with _translator_lock:
+            if _translator is None:
+                _translator = Translator()
+    return _translator
 
 
 # --- Improved vowel diacritics (for consonant+vowel composition) ---
@@ -65,10 +155,13 @@ CONSONANT_BASE = {
 VIRAMA = "்"
 
 
+_RE_NON_ALPHA = re.compile(r'[^A-Za-z]')  # also drops the stress digits
+_GEMINATE_NN = ('ன்' + VIRAMA + 'ன', 'ன்ன')  # n + n -> ன்ன
+_GEMINATE_TT = ('ட்' + VIRAMA + 'ட', 'ட்ட')
+
+
 def normalize_phone(tok: str) -> str:
-    tok = re.sub(r'\d', '', tok)
-    tok = re.sub(r'[^A-Za-z]', '', tok)
-    return tok.upper()
+    return _RE_NON_ALPHA.sub('', tok).upper()
 
 def compose_cons_vowel(cons_base: str, vowel_code: str) -> str:
     """
@@ -85,11 +178,63 @@ def compose_cons_vowel(cons_base: str, vowel_code: str) -> str:
     # even if their visual placement is before the consonant in Unicode rendering.
     return cons_base + vsign
 
+
+# --- Table-driven per-word loop, built once from the maps above ---
+# key: (consonant, vowel) for a syllable, or a single phone. value: one step per state, indexed
+# by whether the word so far ends in a consonant/vowel sign (True) or is empty/ends in a virama
+# (False); a step is (piece, that state after the piece, phones consumed). Only vowels differ
+# between the states: a sign attached to what came before, or the independent letter.
+def _g2p_step(piece, attach_vowel, advance):
+    return piece, (piece[-1] != VIRAMA if piece else attach_vowel), advance
+
+
+G2P_TRANSDUCER = {}
+for _v in VOWEL_SIGN:
+    G2P_TRANSDUCER[_v] = (_g2p_step(INDEPENDENT_VOWEL.get(_v, ""), False, 1), _g2p_step(VOWEL_SIGN[_v], True, 1))
+for _c, _base in CONSONANT_BASE.items():
+    G2P_TRANSDUCER[_c] = (_g2p_step(_base + VIRAMA, False, 1),) * 2  # final consonant (no following vowel)
+    for _v in VOWEL_SIGN:
+        _syllable = compose_cons_vowel(_base, _v)
+        G2P_TRANSDUCER[(_c, _v)] = (_g2p_step(_syllable, False, 2),) * 2
+
+
+@lru_cache(maxsize=None)
+def _fallback_piece(phone):
+    # unmapped phone: transliterate its raw letters (best-effort)
+    return transliterate(phone, sanscript.ITRANS, sanscript.TAMIL)
+
+
+# name (stripped, lowercased) -> transliteration; loaded from the g2p_cache table by
+# load_g2p_cache() and written through on every miss, so a name runs G2p once ever
+_g2p_cache = {}
+
+
+@lru_cache(maxsize=8192)
+def _g2p_word(word):
+    """G2p phones for one word; shared across names, so "Sunflower Oil" reuses "oil" from "Coconut Oil"."""
+    return tuple(get_g2p()(word))
+
+
 def eng_to_tamil_g2p_better(eng: str) -> str:
-    if not eng:
+    key = eng.strip().lower() if eng else ""
+    if not key:
         return ""
+    tamil = _g2p_cache.get(key)
+    if tamil is None:
+        tamil = _g2p_cache[key] = _eng_to_tamil(key)
+        with get_db() as conn:
+            conn.execute("INSERT OR REPLACE INTO g2p_cache (name, tamil) VALUES (?, ?)", (key, tamil))
+    return tamil
+
 
-    raw = g2p(eng)
+def _eng_to_tamil(eng):
+    # G2p is case-insensitive and (homographs aside) word-by-word, so per-word phones
+    # joined by the " " separator G2p itself emits give the same token stream
+    raw = []
+    for word in eng.split():
+        if raw:
+            raw.append(" ")
+        raw.extend(_g2p_word(word))
     words = []
     cur = []
     for tok in raw:
@@ -110,87 +255,479 @@ def eng_to_tamil_g2p_better(eng: str) -> str:
 
     for w in words:
         i = 0
-        tam = ""
-        # If first phone is vowel -> independent vowel
-        if i < len(w) and w[0] in INDEPENDENT_VOWEL:
-            tam += INDEPENDENT_VOWEL[w[0]]
-            i = 1
-        while i < len(w):
+        n = len(w)
+        tam_parts = []
+        attach_vowel = False  # word so far ends in a consonant or vowel sign (not a virama, not empty)
+        while i < n:
             phone = w[i]
-            # vowel-only inside word -> attach to previous consonant if possible, else independent
-            if phone in VOWEL_SIGN:
-                if tam and tam[-1] not in (VIRAMA,):  # previous likely a consonant base or already combined
-                    # naive heuristic: append vowel sign to last consonant cluster if possible
-                    # find last consonant base index:
-                    # simple: just append sign (since consonant base stored without virama earlier)
-                    tam += VOWEL_SIGN[phone]
-                else:
-                    tam += INDEPENDENT_VOWEL.get(phone, "")
-                i += 1
-                continue
-
-            # consonant handling
-            if phone in CONSONANT_BASE:
-                cons = CONSONANT_BASE[phone]
-                next_p = w[i+1] if i+1 < len(w) else None
-                if next_p and next_p in VOWEL_SIGN:
-                    tam_piece = compose_cons_vowel(cons, next_p)
-                    tam += tam_piece
-                    i += 2
-                else:
-                    # final consonant (no following vowel)
-                    tam += cons + VIRAMA
-                    i += 1
-                continue
-
-            # fallback
-            unknown.add(phone)
-            # fallback: transliterate raw phone token letters (best-effort)
-            fb = transliterate(phone, sanscript.ITRANS, sanscript.TAMIL)
-            tam += fb
-            i += 1
+            # consonant + vowel pair first, then the phone on its own
+            step = (i + 1 < n and G2P_TRANSDUCER.get((phone, w[i + 1]))) or G2P_TRANSDUCER.get(phone)
+            if step is None:
+                unknown.add(phone)
+                piece, attach_vowel, advance = _g2p_step(_fallback_piece(phone), attach_vowel, 1)
+            else:
+                piece, attach_vowel, advance = step[attach_vowel]
+            tam_parts.append(piece)
+            i += advance
 
         # postprocess: collapse repeated virama+consonant clusters into geminates if pattern matches
-        # simple replacements for common geminates:
-        tam = re.sub(r'ன்' + VIRAMA + r'ன', 'ன்ன', tam)  # n + n -> ன்ன
-        tam = re.sub(r'ட்' + VIRAMA + r'ட', 'ட்ட', tam)
+        # simple replacements for common geminates (literal patterns, so plain str.replace):
+        tam = "".join(tam_parts).replace(*_GEMINATE_NN).replace(*_GEMINATE_TT)
         tamil_words.append(tam)
 
-    tamil = " ".join(tamil_words)
-    tamil = re.sub(r'\s+', ' ', tamil).strip()
+    tamil = " ".join(" ".join(tamil_words).split())  # collapse runs of whitespace
     # (in production, log `unknown` so you can expand maps)
     return tamil
 
 
 
+# ---------- DB connections ----------
+# idle connections, reused across requests (the dev server runs each request on a new thread).
+# Bounded: a burst opens extra connections, but only DB_POOL_SIZE stay open afterwards.
+DB_POOL_SIZE = 8
+_idle_conns = queue.Queue(maxsize=DB_POOL_SIZE)
+
+
+def _connect():
+    # timeout sets busy_timeout: wait up to 30s for the label app's writes instead of "database is locked"
+    # cached_statements: search/save SQL stays prepared across requests on a pooled connection
+    conn = sqlite3.connect(DB_NAME, timeout=30, check_same_thread=False, cached_statements=256)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA cache_size=-20000")      # ~20MB page cache, kept warm across requests
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=268435456")    # read the db through a 256MB map
+    return conn
+
+
+@contextmanager
+def get_db():
+    """Borrow a pooled connection; commits on success, rolls back on error, then returns it."""
+    try:
+        conn = _idle_conns.get_nowait()
+    except queue.Empty:
+        conn = _connect()
+    try:
+        with conn:
+            yield conn
+    finally:
+        try:
+            _idle_conns.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+
+# ---------- Server-side session ----------
+# The temp product list grows with every add; kept in the signed cookie it was re-serialized,
+# re-signed and re-sent on every request (search keystrokes included). Now the cookie holds
+# only a random session id and the data lives in the `sessions` table.
+SESSION_MAX_AGE_DAYS = 7
+# views under these prefixes never use the session, so their requests (every search keystroke,
+# every static file) skip the sessions-table read; add a prefix here only if that stays true
+SESSIONLESS_PATH_PREFIXES = ("/api/", "/static/")
+
+
+class ServerSideSession(SecureCookieSession):
+    """Session dict whose contents live in the sessions table under `sid`."""
+
+    def __init__(self, initial=None, sid=None, loaded=True):
+        super().__init__(initial)
+        self.sid = sid
+        self.loaded = loaded  # False: row never read, so it must never be written back either
+
+
+class SqliteSessionInterface(SessionInterface):
+    serializer = TaggedJSONSerializer()  # same encoding Flask uses for cookie sessions
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if request.path.startswith(SESSIONLESS_PATH_PREFIXES):
+            return ServerSideSession(sid=sid, loaded=False)
+        if sid:
+            with get_db() as conn:
+                row = conn.execute("SELECT data FROM sessions WHERE sid = ?", (sid,)).fetchone()
+            if row:
+                return ServerSideSession(self.serializer.loads(row["data"]), sid=sid)
+        # unknown or missing id: start fresh under a new id rather than adopting the client's
+        return ServerSideSession(sid=secrets.token_urlsafe(32))
+
+    def save_session(self, app, session, response):
+        if not session.loaded:
+            return
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.modified:
+                with get_db() as conn:
+                    conn.execute("DELETE FROM sessions WHERE sid = ?", (session.sid,))
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if session.accessed:
+            response.vary.add("Cookie")
+        if not self.should_set_cookie(app, session):
+            return
+
+        with get_db() as conn:
+            # UPSERT updates the row in place; OR REPLACE deleted and re-inserted it on every save
+            conn.execute(
+                "INSERT INTO sessions (sid, data, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(sid) DO UPDATE SET data = excluded.data, updated = excluded.updated",
+                (session.sid, self.serializer.dumps(dict(session)),
+                 datetime.datetime.now().isoformat(sep=" ", timespec="seconds")),
+            )
+        response.set_cookie(
+            name, session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain, path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+
+app.session_interface = SqliteSessionInterface()
+
+
+# ---------- Background translation ----------
+# googletrans is a network round-trip; run it off the request path.
+_xlat_pool = ThreadPoolExecutor(max_workers=4)
+XLAT_WAIT_SECONDS = 0.3  # how long an add waits for a fast translation before answering with the placeholder
+_xlat_cache = {}    # english name -> tamil, so repeat names skip the network
+_xlat_translated = {}  # the part of _xlat_cache that came from googletrans; only this is persisted
+# barcode -> (english name, tamil), filled in by the pool for pending temp products. The name
+# travels with the result: a barcode re-added under a corrected name must not take the old
+# name's translation. Abandoned carts never collect theirs, so the oldest go past XLAT_RESULTS_MAX.
+_xlat_results = {}
+_xlat_results_lock = threading.Lock()
+XLAT_RESULTS_MAX = 1000
+_xlat_cache_dirty = False
+
+
+def _translate_en_ta(name):
+    """googletrans en -> ta through _xlat_cache. Raises like translator.translate on a miss."""
+    global _xlat_cache_dirty
+    tamil_name = _xlat_cache.get(name)
+    if tamil_name is None:
+        tamil_name = get_translator().translate(name, src='en', dest='ta').text
+        _xlat_cache[name] = _xlat_translated[name] = tamil_name
+        _xlat_cache_dirty = True
+    return tamil_name
+
+
+def _translate_batch_en_ta(names):
+    """
+    Translate several names with one googletrans call (list input); cached names
+    are skipped. Returns {name: tamil} for everything that got a translation.
+    """
+    global _xlat_cache_dirty
+    misses = list(dict.fromkeys(n for n in names if n not in _xlat_cache))
+    if misses:
+        try:
+            for name, res in zip(misses, get_translator().translate(misses, src='en', dest='ta')):
+                _xlat_cache[name] = _xlat_translated[name] = res.text
+            _xlat_cache_dirty = True
+        except Exception as e:
+            print(f"batch translation failed for {len(misses)} names, keeping english: {e}")
+    return {n: _xlat_cache[n] for n in names if n in _xlat_cache}
+
+
+def load_translation_cache():
+    """
+    Fill _xlat_cache from the names already in products, then from TRANSLATION_CACHE_PATH,
+    so known products never hit the network. Stored tamil names may be g2p output or
+    manual edits, so real googletrans results from the file take precedence; only those
+    (plus new ones) are written back at exit.
+    """
+    with get_db() as conn:
+        # add_temp / add_by_barcode look names up capitalized; same-as-english means translation had failed
+        _xlat_cache.update(
+            (row["name"].capitalize(), row["tamil_name"])
+            for row in conn.execute("SELECT name, tamil_name FROM products")
+            if row["tamil_name"] and row["tamil_name"] != row["name"]
+        )
+    if os.path.exists(TRANSLATION_CACHE_PATH):
+        try:
+            with open(TRANSLATION_CACHE_PATH, encoding="utf-8") as f:
+                _xlat_translated.update(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"ignoring unreadable translation cache: {e}")
+    _xlat_cache.update(_xlat_translated)
+    atexit.register(_save_translation_cache)
+
+
+def _save_translation_cache():
+    if not _xlat_cache_dirty:
+        return
+    tmp_path = TRANSLATION_CACHE_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        # snapshot: pool threads may still be adding entries while the interpreter exits
+        json.dump(dict(_xlat_translated), f, ensure_ascii=False)
+    os.replace(tmp_path, TRANSLATION_CACHE_PATH)
+
+
+def load_g2p_cache():
+    """Fill _g2p_cache from the g2p_cache table, so names seen in earlier runs skip the G2p model."""
+    with get_db() as conn:
+        _g2p_cache.update(conn.execute("SELECT name, tamil FROM g2p_cache").fetchall())
+
+
+def _translate_and_store(barcode, name):
+    try:
+        tamil_name = _translate_en_ta(name)
+    except Exception as e:
+        print(f"background translation failed for {name!r}, keeping english: {e}")
+        return
+    with _xlat_results_lock:
+        _xlat_results[barcode] = (name, tamil_name)
+        while len(_xlat_results) > XLAT_RESULTS_MAX:
+            _xlat_results.pop(next(iter(_xlat_results)), None)
+
+
+def _translate_later(product):
+    """
+    Mark a temp product as waiting on googletrans and queue the lookup; its english name stands in.
+    A translation that comes back within XLAT_WAIT_SECONDS is applied straight away, so the
+    common fast case needs no polling; a slow one no longer holds the request.
+    """
+    product["tamil_pending"] = True
+    _xlat_results.pop(product["barcode"], None)
+    future = _xlat_pool.submit(_translate_and_store, product["barcode"], product["name"])
+    try:
+        future.result(timeout=XLAT_WAIT_SECONDS)
+    except FutureTimeout:
+        return
+    _apply_translations([product])
+
+
+def _apply_translations(temp_products):
+    """Patch finished background translations into pending temp products. Returns True if any changed."""
+    changed = False
+    for p in temp_products:
+        result = _xlat_results.get(p["barcode"]) if p.get("tamil_pending") else None
+        if result is not None and result[0] == p["name"]:
+            p["tamil_name"] = result[1]
+            del p["tamil_pending"]
+            changed = True
+    return changed
+
+
 # ---------- CREATE DB ----------
+# columns the JSON endpoints return for a product
+SEARCH_COLUMNS = ("barcode", "name", "tamil_name", "measure", "quantity", "mrp", "retail_price")
+
+# Statement texts shared by the routes. sqlite3 caches prepared statements per connection
+# keyed by SQL text, so one constant per statement means one cache entry that every
+# request on a pooled connection hits.
+SQL_INSERT_PRODUCT = """
+    INSERT OR REPLACE INTO products
+        (barcode, name, tamil_name, timestamp, measure, quantity, mrp, retail_price)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+SQL_UPDATE_PRODUCT = """
+    UPDATE products
+    SET name=?, tamil_name=?, measure=?, quantity=?, mrp=?, retail_price=?
+    WHERE barcode=?
+"""
+SQL_DELETE_PRODUCT = "DELETE FROM products WHERE barcode=?"
+SQL_GET_PRODUCT = f"SELECT {', '.join(SEARCH_COLUMNS)} FROM products WHERE barcode=?"
+SQL_ALL_PRODUCTS = f"SELECT {', '.join(SEARCH_COLUMNS)} FROM products ORDER BY name"
+SQL_CATALOG_VERSION = "SELECT version FROM catalog_version WHERE id = 1"
+
+# ---------- Catalog version ----------
+# /api/all_products sends catalog_version() as a weak ETag so an unchanged catalog is answered
+# with a 304 instead of the full list; /api/search memoizes on it. The per-process token keeps
+# a recreated db (version back at 0) from matching an ETag handed out before the restart.
+_catalog_epoch = secrets.token_hex(4)
+
+
+def catalog_version(conn):
+    """
+    Write counter kept in the db by triggers on products: every insert, update or delete
+    bumps it, whichever process or tool made it. One primary-key read.
+    """
+    return conn.execute(SQL_CATALOG_VERSION).fetchone()[0]
+
+
+def catalog_etag(conn):
+    return f"{_catalog_epoch}-{catalog_version(conn)}"
+
+
 def init_db():
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS products (
-            barcode TEXT PRIMARY KEY,
-            name TEXT NOT NULL,
-            tamil_name TEXT NOT NULL,
-            timestamp TEXT NOT NULL,
-            measure TEXT NOT NULL,
-            quantity REAL NOT NULL,
-            mrp REAL NOT NULL,
-            retail_price REAL NOT NULL
+    # also opens the first pooled connection, so the first request doesn't pay for it
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS products (
+                barcode TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                tamil_name TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                measure TEXT NOT NULL,
+                quantity REAL NOT NULL,
+                mrp REAL NOT NULL,
+                retail_price REAL NOT NULL
+            )
+        ''')
+        # covering index in name order: all_products and the LIKE fallback read it
+        # without a sort or table lookups
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_products_name_cov'"
+        ).fetchone()
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_products_name_cov "
+            "ON products(name, barcode, tamil_name, measure, quantity, mrp, retail_price)"
         )
-    ''')
-    conn.commit()
-    conn.close()
+        if not exists:
+            conn.execute("ANALYZE")
+        init_fts(conn)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sessions (
+                sid TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                updated TEXT NOT NULL
+            )
+        ''')
+        # session cookies end with the browser, so rows nobody has touched in a week are orphans
+        cutoff = datetime.datetime.now() - datetime.timedelta(days=SESSION_MAX_AGE_DAYS)
+        cursor.execute("DELETE FROM sessions WHERE updated < ?", (cutoff.isoformat(sep=" ", timespec="seconds"),))
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS g2p_cache (
+                name TEXT PRIMARY KEY,
+                tamil TEXT NOT NULL
+            )
+        ''')
+        init_catalog_version(conn)
+        seed_last_barcode(conn)
+
+
+def init_catalog_version(conn):
+    """One-row catalog_version table plus the triggers that bump it (see catalog_version)."""
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS catalog_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0);
+        CREATE TRIGGER IF NOT EXISTS products_version_ai AFTER INSERT ON products BEGIN
+            UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS products_version_au AFTER UPDATE ON products BEGIN
+            UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS products_version_ad AFTER DELETE ON products BEGIN
+            UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+        END;
+    """)
+
+
+@lru_cache(maxsize=None)
+def _search_sql(columns):
+    """(barcode, FTS, LIKE fallback) statements for a column tuple; built once so the text is stable."""
+    return (
+        f"SELECT {', '.join(columns)} FROM products WHERE barcode = ?",
+        f"""
+        SELECT {", ".join("p." + c for c in columns)}
+        FROM products_fts f JOIN products p ON p.rowid = f.rowid
+        WHERE products_fts MATCH ? ORDER BY rank LIMIT ?
+        """,
+        f"""
+        SELECT {", ".join(columns)} FROM products
+        WHERE name LIKE ? OR tamil_name LIKE ? OR barcode LIKE ?
+        ORDER BY name LIMIT ?
+        """,
+    )
+
+
+def search_fts(conn, query, columns, limit=-1):
+    """
+    Products matching every word of `query` as a prefix (name, tamil name or barcode),
+    best match first; an exact barcode returns just that product. Queries with
+    nothing to tokenize, or a db without products_fts, fall back to the old LIKE scan.
+    """
+    barcode_sql, fts_sql, like_sql = _search_sql(tuple(columns))
+    if query.isdigit():
+        # a scanned / typed full barcode: one primary-key probe beats any text search
+        row = conn.execute(barcode_sql, (query,)).fetchone()
+        if row:
+            return [dict(row)]
+    if any(ch.isalnum() for ch in query):
+        try:
+            cur = conn.execute(fts_sql, (fts_prefix_query(query), limit))
+            return [dict(row) for row in cur.fetchall()]
+        except sqlite3.OperationalError:
+            pass
+    cur = conn.execute(like_sql, (f"%{query}%", f"%{query}%", f"%{query}%", limit))
+    return [dict(row) for row in cur.fetchall()]
+
+
+# last barcode handed out by add_temp; guarded so concurrent adds never share one
+_barcode_lock = threading.Lock()
+_last_barcode = 0
+
+
+def _barcode_stamp(now):
+    return now.year * 10**10 + now.month * 10**8 + now.day * 10**6 + now.hour * 10**4 + now.minute * 100 + now.second
+
+
+def next_barcode(now):
+    """
+    14-digit YYYYMMDDHHMMSS barcode for `now`, bumped past the previous one when two
+    adds land in the same second (INSERT OR REPLACE would otherwise overwrite the first).
+    """
+    global _last_barcode
+    stamp = _barcode_stamp(now)
+    with _barcode_lock:
+        _last_barcode = max(stamp, _last_barcode + 1)
+        return str(_last_barcode)
+
+
+def seed_last_barcode(conn):
+    """
+    Start next_barcode above the newest timestamp barcode already in products, so codes
+    bumped ahead of the clock before a restart aren't handed out again. Only plausible
+    timestamps count: a scanned 14-digit GTIN must not drag the sequence into its range.
+    """
+    global _last_barcode
+    latest = _barcode_stamp(datetime.datetime.now() + datetime.timedelta(days=1))
+    row = conn.execute(
+        "SELECT MAX(barcode) FROM products WHERE length(barcode) = 14 "
+        "AND barcode NOT GLOB '*[^0-9]*' AND barcode BETWEEN '20000101000000' AND ?",
+        (str(latest),),
+    ).fetchone()
+    if row[0]:
+        with _barcode_lock:
+            _last_barcode = max(_last_barcode, int(row[0]))
+
+
+def clear_old_session():
+    """
+    Drop a temp list saved before mrp/retail_price existed. Called by the routes that
+    use the temp list, not on every request: API calls and static files never look at it.
+    """
+    if "temp_products" in session:
+        # clear if old schema found
+        if session["temp_products"] and "mrp" not in session["temp_products"][0]:
+            session["temp_products"] = []
+            session.modified = True
+
 
 @app.route('/')
 def home():
+    clear_old_session()
     if "temp_products" not in session:
         session["temp_products"] = []
+    if _apply_translations(session["temp_products"]):
+        session.modified = True
     return render_template("index2.html", temp_products=session["temp_products"])
 
 
 @app.route('/delete_temp/<barcode>', methods=['POST'])
 def delete_temp(barcode):
+    clear_old_session()
     if "temp_products" in session:
         # compare as strings to avoid int/string mismatch
         session["temp_products"] = [
@@ -198,6 +735,7 @@ def delete_temp(barcode):
             if str(p.get("barcode")) != str(barcode)
         ]
         session.modified = True
+    _xlat_results.pop(str(barcode), None)
 
     if request.headers.get("X-Requested-With") == "XMLHttpRequest":
         return jsonify(ok=True), 200
@@ -205,33 +743,57 @@ def delete_temp(barcode):
     return redirect('/')
 
 
+if orjson is not None:
+    def _json_rows(rows):
+        """Rows as comma-separated JSON objects (UTF-8): one orjson call per batch, list brackets cut off."""
+        return orjson.dumps([dict(r) for r in rows])[1:-1]
+else:
+    def _json_rows(rows):
+        """Rows as comma-separated JSON objects (UTF-8)."""
+        return ",".join(json.dumps(dict(r), ensure_ascii=False) for r in rows).encode()
+
+
 @app.route("/api/all_products")
 def api_all_products():
-    """Return full product list as JSON."""
+    """Return full product list as JSON, streamed in batches straight off the cursor."""
+    def generate():
+        # the pooled connection stays borrowed until the last batch is sent (or the client goes away)
+        with get_db() as conn:
+            cursor = conn.execute(SQL_ALL_PRODUCTS)
+            yield b"["
+            sep = b""
+            for batch in iter(lambda: cursor.fetchmany(500), []):
+                yield sep + _json_rows(batch)
+                sep = b","
+            yield b"]"
+
     try:
-        conn = sqlite3.connect(DB_NAME)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT barcode, name, tamil_name, measure, quantity, mrp, retail_price
-            FROM products
-            ORDER BY name
-        """)
-        rows = [dict(r) for r in cursor.fetchall()]
-        conn.close()
-        return jsonify(rows)
+        with get_db() as conn:
+            etag = catalog_etag(conn)
+        if request.if_none_match.contains_weak(etag):
+            resp = Response(status=304)
+            resp.set_etag(etag, weak=True)
+            return resp
+        body = generate()
+        first = next(body)  # runs the query here, so a failure still gets the JSON 500
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+    resp = Response(itertools.chain([first], body), mimetype="application/json")
+    resp.set_etag(etag, weak=True)
+    resp.headers["Cache-Control"] = "private, must-revalidate"
+    return resp
 
 
 # --- add_temp endpoint (paste replacing existing add_temp) ---
 @app.route('/add_temp', methods=['POST'])
 def add_temp():
+    clear_old_session()
     name = request.form["name"].capitalize()
     print("Temporary product adding...")
     print(f"{name = }")
     # choose which tamil-name generator to use:
     use_g2p = request.form.get("use_g2p")  # returns 'on' if checkbox checked, otherwise None
+    pending = False
     if not use_g2p:
         try:
             tamil_name = eng_to_tamil_g2p_better(name)
@@ -239,27 +801,26 @@ def add_temp():
             # fallback to translator if g2p fails
             print(f"g2p failed: {e}; falling back to google translate")
             try:
-                tamil_name = translator.translate(name, src='en', dest='ta').text
+                tamil_name = _translate_en_ta(name)
             except Exception as ex:
                 print(f"google translate fallback failed: {ex}")
                 tamil_name = name
     else:
-        # default path: use googletrans translator
-        try:
-            tamil_name = translator.translate(name, src='en', dest='ta').text
-        except Exception as e:
-            print(f"translation failed, falling back to english: {e}")
+        # default path: use googletrans translator, in the background unless already cached;
+        # the english name stands in until the translation lands
+        tamil_name = _xlat_cache.get(name)
+        if tamil_name is None:
             tamil_name = name
+            pending = True
 
     measure = request.form["measure"]
     quantity = float(request.form["quantity"])
     mrp = float(request.form["mrp"])
     retail_price = float(request.form["retail_price"])
 
-    timestamp = datetime.datetime.now().isoformat(sep=" ", timespec="seconds")
-
-    new = datetime.datetime.now()
-    barcode = new.strftime("%Y%m%d%H%M%S")
+    now = datetime.datetime.now()
+    timestamp = now.isoformat(sep=" ", timespec="seconds")
+    barcode = next_barcode(now)
     product = {
         "barcode": barcode,
         "name": name,
@@ -270,6 +831,8 @@ def add_temp():
         "mrp": mrp,
         "retail_price": retail_price
     }
+    if pending:
+        _translate_later(product)
 
     if "temp_products" not in session:
         session["temp_products"] = []
@@ -289,6 +852,7 @@ def add_by_barcode():
     New endpoint: accepts barcode from scanner/input and rest of the product fields.
     Per user requirement, tamil_name is created from english name "as it is" (no translation) unless g2p requested.
     """
+    clear_old_session()
     # Basic validation
     barcode = request.form.get("barcode", "").strip()
     name = request.form.get("name", "").strip()
@@ -314,24 +878,29 @@ def add_by_barcode():
 
     name_cap = name.capitalize()
 
+    # a re-scanned product already has a tamil name in the db; same english name -> reuse it
+    with get_db() as conn:
+        existing = conn.execute(SQL_GET_PRODUCT, (barcode,)).fetchone()
+    if existing is not None and existing["name"].lower() != name_cap.lower():
+        existing = None
+
     # Decide which tamil-name generator to use
     use_g2p = request.form.get("use_g2p")
-    if not use_g2p:
+    if existing is not None:
+        tamil_name = existing["tamil_name"]
+    elif not use_g2p:
         try:
             tamil_name = eng_to_tamil_g2p_better(name_cap)
         except Exception as e:
             print(f"g2p failed for barcode add: {e}; falling back to google translate")
             try:
-                tamil_name = translator.translate(name_cap, src='en', dest='ta').text
+                tamil_name = _translate_en_ta(name_cap)
             except Exception as ex:
                 print(f"google translate fallback failed: {ex}")
                 tamil_name = name_cap
     else:
-        try:
-            tamil_name = translator.translate(name_cap, src='en', dest='ta').text
-        except Exception as e:
-            print(f"translation failed, falling back to english: {e}")
-            tamil_name = name_cap
+        # googletrans in the background unless cached, as in add_temp
+        tamil_name = _xlat_cache.get(name_cap, name_cap)
 
     timestamp = datetime.datetime.now().isoformat(sep=" ", timespec="seconds")
 
@@ -345,20 +914,18 @@ def add_by_barcode():
         "mrp": mrp_f,
         "retail_price": retail_price_f
     }
-
-    # ensure session list exists
-    if "temp_products" not in session:
-        session["temp_products"] = []
-
-    # avoid duplicate barcode in temp list
-    existing = [p for p in session["temp_products"] if str(p.get("barcode")) == str(barcode)]
-    if existing:
-        session["temp_products"] = [p for p in session["temp_products"] if str(p.get("barcode")) != str(barcode)]
-        session["temp_products"].append(product)
-
+    if existing is None and use_g2p and name_cap not in _xlat_cache:
+        _translate_later(product)
+
+    # avoid duplicate barcode in temp list: replace the existing entry in one pass
+    temp = session.setdefault("temp_products", [])
+    for i, p in enumerate(temp):
+        if str(p.get("barcode")) == str(barcode):
+            temp[i] = product
+            break
     else:
-        session["temp_products"].append(product)
-        session.modified = True
+        temp.append(product)
+    session.modified = True
 
     if request.headers.get("X-Requested-With") == "XMLHttpRequest":
         return jsonify(ok=True, product=product), 200
@@ -369,63 +936,65 @@ def add_by_barcode():
 
 @app.route('/save_all', methods=['POST'])
 def save_all():
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    clear_old_session()
+    _apply_translations(session["temp_products"])
+    # whatever the background pool hasn't finished goes out as one batched request
+    pending = [p for p in session["temp_products"] if p.get("tamil_pending")]
+    if pending:
+        done = _translate_batch_en_ta([p["name"] for p in pending])
+        for p in pending:
+            if p["name"] in done:
+                p["tamil_name"] = done[p["name"]]
+    rows = [(p["barcode"], p["name"], p["tamil_name"], p["timestamp"],
+             p["measure"], p["quantity"], p["mrp"], p["retail_price"])
+            for p in session["temp_products"]]
+    with get_db() as conn:
+        # one transaction, one prepared statement for the whole batch; IMMEDIATE takes the
+        # write lock up front so the batch can't hit SQLITE_BUSY midway on a lock upgrade
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(SQL_INSERT_PRODUCT, rows)
     for p in session["temp_products"]:
-        cursor.execute('''INSERT OR REPLACE INTO products 
-            (barcode, name, tamil_name, timestamp, measure, quantity, mrp, retail_price) 
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
-            (p["barcode"], p["name"], p["tamil_name"], p["timestamp"],
-             p["measure"], p["quantity"], p["mrp"], p["retail_price"]))
-    conn.commit()
-    conn.close()
+        _xlat_results.pop(p["barcode"], None)
     session["temp_products"] = []
     return redirect('/')
 
 
-@app.before_request
-def clear_old_session():
-    if "temp_products" in session:
-        # clear if old schema found
-        if session["temp_products"] and "mrp" not in session["temp_products"][0]:
-            session["temp_products"] = []
-            session.modified = True
+@app.route("/api/translation/<barcode>")
+def api_translation(barcode):
+    """Poll for the background translation of a temp product."""
+    # only the name the page is showing; a result for an earlier name under this barcode doesn't count
+    result = _xlat_results.get(barcode)
+    tamil_name = result[1] if result is not None and result[0] == request.args.get("name") else None
+    return jsonify(ready=tamil_name is not None, tamil_name=tamil_name)
 
 
 @app.route("/search", methods=["GET", "POST"])
 def search_products():
+    clear_old_session()
     query = request.args.get("q", "").strip()
     results = []
     if query:
-        conn = sqlite3.connect(DB_NAME)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT * FROM products 
-            WHERE name LIKE ? OR tamil_name LIKE ? OR barcode LIKE ?
-        """, (f"%{query}%", f"%{query}%", f"%{query}%"))
-        results = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+        with get_db() as conn:
+            results = search_fts(conn, query, ("*",))
     return render_template("index2.html", temp_products=session.get("temp_products", []), results=results, search_query=query)
 
 
+@lru_cache(maxsize=1024)
+def _api_search_body(query, version):
+    """Encoded /api/search result; `version` is catalog_version(), so any write retires old entries."""
+    with get_db() as conn:
+        return app.json.dumps(search_fts(conn, query, SEARCH_COLUMNS, limit=10))
+
+
 @app.route("/api/search")
 def api_search():
     query = request.args.get("q", "").strip()
-    results = []
-    if len(query) >= 2:  # only start after 2+ chars
-        conn = sqlite3.connect(DB_NAME)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT barcode, name, tamil_name, measure, quantity, mrp, retail_price 
-            FROM products
-            WHERE name LIKE ? OR tamil_name LIKE ?
-            ORDER BY name LIMIT 10
-        """, (f"%{query}%", f"%{query}%"))
-        results = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-    return jsonify(results)
+    if len(query) < 2:  # only start after 2+ chars
+        return jsonify([])
+    # scanners and typing repeat the same prefixes; unchanged catalog -> one version read, no search
+    with get_db() as conn:
+        version = catalog_version(conn)
+    return Response(_api_search_body(query, version), mimetype="application/json")
 
 
 @app.route("/edit/<barcode>", methods=["POST"])
@@ -438,15 +1007,9 @@ def edit_product(barcode):
     mrp = float(request.form["mrp"])
     retail_price = float(request.form["retail_price"])
 
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("""
-        UPDATE products 
-        SET name=?, tamil_name=?, measure=?, quantity=?, mrp=?, retail_price=? 
-        WHERE barcode=?
-    """, (name, tamil_name, measure, quantity, mrp, retail_price, barcode))
-    conn.commit()
-    conn.close()
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(SQL_UPDATE_PRODUCT, (name, tamil_name, measure, quantity, mrp, retail_price, barcode))
 
     return redirect(f"/search?q={name}")
 
@@ -467,19 +1030,13 @@ def api_edit(barcode):
     if not name:
         return jsonify(ok=False, error="Name required"), 400
 
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("""
-        UPDATE products 
-        SET name=?, tamil_name=?, measure=?, quantity=?, mrp=?, retail_price=? 
-        WHERE barcode=?
-    """, (name.capitalize(), tamil_name, measure, quantity, mrp, retail_price, barcode))
-    conn.commit()
-
-    # return the updated row
-    cursor.execute("SELECT barcode, name, tamil_name, measure, quantity, mrp, retail_price FROM products WHERE barcode=?", (barcode,))
-    row = cursor.fetchone()
-    conn.close()
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(SQL_UPDATE_PRODUCT, (name.capitalize(), tamil_name, measure, quantity, mrp, retail_price, barcode))
+
+        # return the updated row
+        cursor.execute(SQL_GET_PRODUCT, (barcode,))
+        row = cursor.fetchone()
     if not row:
         return jsonify(ok=False, error="Product not found"), 404
 
@@ -497,12 +1054,10 @@ def api_edit(barcode):
 @app.route("/api/delete/<barcode>", methods=["POST"])
 def api_delete(barcode):
     """AJAX-friendly delete."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM products WHERE barcode=?", (barcode,))
-    conn.commit()
-    changed = cursor.rowcount
-    conn.close()
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(SQL_DELETE_PRODUCT, (barcode,))
+        changed = cursor.rowcount
     if changed:
         return jsonify(ok=True), 200
     else:
@@ -510,25 +1065,13 @@ def api_delete(barcode):
 
 # ---------------------------------------------------------------------------
 
-@app.route("/api/search")
-def api_search_dup():
-    # Note: this duplicate isn't ideal but left for safety; actual earlier function is used.
-    query = request.args.get("q", "").strip()
-    results = []
-    if len(query) >= 2:
-        conn = sqlite3.connect(DB_NAME)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT barcode, name, tamil_name, measure, quantity, mrp, retail_price 
-            FROM products
-            WHERE name LIKE ? OR tamil_name LIKE ?
-            ORDER BY name LIMIT 10
-        """, (f"%{query}%", f"%{query}%"))
-        results = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-    return jsonify(results)
+# schema and caches at import, not only under __main__: `flask run` and WSGI servers import
+# this module, and the session interface / g2p cache need their tables on the very first request
+init_db()
+load_translation_cache()
+load_g2p_cache()
 
 if __name__ == "__main__":
-    init_db()
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":  # the serving child, not the reloader parent
+        threading.Thread(target=get_g2p, daemon=True).start()
     app.run(debug=True, port=5001)
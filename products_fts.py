@@ -0,0 +1,58 @@
+# products_fts.py
+# Full-text index over the shared products table. product_adding and label_printing both
+# call init_fts() at startup, so whichever app starts first builds the table and triggers.
+
+# products_fts columns
+FTS_COLUMNS = ("name", "tamil_name", "barcode")
+
+
+def init_fts(conn):
+    """
+    Full-text index over products name / tamil_name / barcode for search and autocomplete.
+    External-content FTS5 table kept in sync by triggers. INSERT OR REPLACE does
+    not fire DELETE triggers, so the BEFORE INSERT trigger drops the entry of a
+    row that is about to be replaced. unicode61 splits on combining marks by
+    default, which would cut Tamil words at every vowel sign, so M* is added to
+    the token categories. An index from an older layout is dropped and rebuilt.
+    """
+    cols = [row[1] for row in conn.execute("PRAGMA table_info(products_fts)")]
+    if cols and tuple(cols) != FTS_COLUMNS:
+        conn.executescript("""
+            DROP TRIGGER IF EXISTS products_fts_bi;
+            DROP TRIGGER IF EXISTS products_fts_ai;
+            DROP TRIGGER IF EXISTS products_fts_ad;
+            DROP TRIGGER IF EXISTS products_fts_au;
+            DROP TABLE products_fts;
+        """)
+        cols = []
+    conn.executescript("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+            name, tamil_name, barcode, content='products', content_rowid='rowid',
+            tokenize="unicode61 remove_diacritics 2 categories 'L* N* Co M*'"
+        );
+        CREATE TRIGGER IF NOT EXISTS products_fts_bi BEFORE INSERT ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name, tamil_name, barcode)
+                SELECT 'delete', rowid, name, tamil_name, barcode FROM products WHERE barcode = new.barcode;
+        END;
+        CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+            INSERT INTO products_fts(rowid, name, tamil_name, barcode)
+                VALUES (new.rowid, new.name, new.tamil_name, new.barcode);
+        END;
+        CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name, tamil_name, barcode)
+                VALUES ('delete', old.rowid, old.name, old.tamil_name, old.barcode);
+        END;
+        CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name, tamil_name, barcode)
+                VALUES ('delete', old.rowid, old.name, old.tamil_name, old.barcode);
+            INSERT INTO products_fts(rowid, name, tamil_name, barcode)
+                VALUES (new.rowid, new.name, new.tamil_name, new.barcode);
+        END;
+    """)
+    if not cols:
+        conn.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+
+
+def fts_prefix_query(q: str) -> str:
+    """Turn free text into an FTS5 query: every word quoted (no syntax errors) and prefix-matched."""
+    return " ".join('"' + word.replace('"', '""') + '"*' for word in q.split())